@@ -3,66 +3,109 @@ import sys
 import os
 import time
 import threading
+import concurrent.futures
+import collections
+import re
 import urllib.request
 import zipfile
-import io
+import tempfile
 import shutil
 
+# Snapshot of os.environ passed to child processes. Call refresh_child_env()
+# after modifying os.environ so subprocesses see the change.
+_CHILD_ENV = os.environ.copy()
+
+def refresh_child_env():
+    """
+    Rebuilds the environment snapshot passed to child processes from os.environ.
+    """
+    global _CHILD_ENV
+    _CHILD_ENV = os.environ.copy()
+
 def check_python_version():
     major, minor = sys.version_info[:2]
     if major == 3 and minor == 12:
         print("\n You are using Python 3.12. Some dependencies like 'tiktoken' may require 'setuptools' and Rust toolchain.")
         print("   If facing errors, you should installing setuptools manually or switching to Python 3.11 for best compatibility.\n")
 
-def ensure_setuptools():
-    """
-    Ensures that setuptools is installed in the environment.
+SKIPPED_SEARCH_DIRS = {"node_modules", ".git", "__pycache__", ".venv"}
 
-    This function attempts to import the setuptools module. If the import
-    fails, it installs setuptools using pip. If setuptools is already
-    installed, it prints a confirmation message.
-    """
-
-    try:
-        import setuptools
-    except ImportError:
-        print("setuptools not found. Installing it now...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "setuptools"])
-    else:
-        print("setuptools is already installed.")
-        
 def find_requirements_txt(base_dir):
     """
     Searches for the 'requirements.txt' file within the base directory.
+
+    The base directory itself is checked first. Otherwise, subdirectories are searched
+    breadth-first, skipping dependency and cache folders such as node_modules and .git.
     
     Returns the full path if found, otherwise returns None.
     """
-    for root, _, files in os.walk(base_dir):
-        if "requirements.txt" in files:
-            return os.path.join(root, "requirements.txt")
+    direct = os.path.join(base_dir, "requirements.txt")
+    if os.path.isfile(direct):
+        return direct
+
+    pending = collections.deque([base_dir])
+    while pending:
+        current = pending.popleft()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIPPED_SEARCH_DIRS:
+                            pending.append(entry.path)
+                    elif entry.name == "requirements.txt" and entry.is_file():
+                        return entry.path
+        except OSError:
+            continue
     return None
 
 def install_python_dependencies():
     """
     Installs Python dependencies from the requirements.txt file found in the project directory.
 
-    If requirements.txt is found, it installs dependencies using pip. Otherwise, it prints a warning and skips installation.
+    setuptools is installed in the same pip invocation as the requirements so that pip
+    only has to start up and resolve once. If requirements.txt is not found, it prints a
+    warning and only installs setuptools.
+
+    pip is first asked to install prebuilt wheels only (--only-binary=:all:) to avoid slow
+    source builds. If that fails for any reason (e.g. a package has no wheel for this
+    platform), it retries once without --only-binary.
     """
     base_dir = os.path.dirname(os.path.abspath(__file__))
     requirements_path = find_requirements_txt(base_dir)
 
-    if not requirements_path:
-        print("Warning: No 'requirements.txt' found. Skipping Python dependency installation.")
-        return
+    pip_args = [sys.executable, "-m", "pip", "install"]
+    if requirements_path:
+        print(f"Installing Python dependencies from {requirements_path}...")
+        pip_args += ["-r", requirements_path]
+    else:
+        print("Warning: No 'requirements.txt' found. Only installing setuptools.")
+    pip_args.append("setuptools")
 
     try:
-        print(f"Installing Python dependencies from {requirements_path}...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", requirements_path])
+        try:
+            subprocess.check_call(pip_args + ["--only-binary=:all:"], env=_CHILD_ENV)
+        except subprocess.CalledProcessError:
+            print("pip install failed; retrying without --only-binary...")
+            subprocess.check_call(pip_args, env=_CHILD_ENV)
         print("Python dependencies installed successfully.")
     except subprocess.CalledProcessError:
         print("An error occurred while installing Python dependencies.")
         sys.exit(1)
 
+def remove_directory_tree(path):
+    """
+    Removes a directory tree using the native OS command ('rd /s /q' on Windows, 'rm -rf' elsewhere).
+
+    This is much faster than shutil.rmtree for folders with many small files such as node_modules.
+    Like shutil.rmtree(..., ignore_errors=True), failures are ignored.
+    """
+    if not os.path.isdir(path):
+        return
+    if os.name == "nt":
+        subprocess.run(["cmd", "/c", "rd", "/s", "/q", path])
+    else:
+        subprocess.run(["rm", "-rf", path])
+
 def install_npm_dependencies():
     """
     Installs npm dependencies from the package.json in the gradle_project folder.
@@ -71,7 +114,12 @@ def install_npm_dependencies():
 
     1. Removes the existing node_modules folder.
     2. Clears the npm cache.
-    3. Installs npm dependencies with verbose output.
+    3. Installs npm dependencies, skipping the audit and funding checks and preferring
+       cached packages. Output is verbose when SUMMARIZER_DEBUG is set.
+
+    Steps 1 and 2 only run when the SUMMARIZER_FRESH_INSTALL environment variable is set
+    to "1", since a corrupted install is the only reason to discard them. Otherwise npm
+    install creates or updates node_modules in place, reusing the npm cache.
 
     If any step fails, the function will output an error message and exit the program.
 
@@ -82,15 +130,25 @@ def install_npm_dependencies():
     package_json_path = os.path.join(gradle_project_dir, "package.json")
     
     if os.path.exists(package_json_path):
+        node_modules_dir = os.path.join(gradle_project_dir, "node_modules")
         try:
-            print("Removing existing node_modules...")
-            shutil.rmtree(os.path.join(gradle_project_dir, "node_modules"), ignore_errors=True)
-            
-            print("Clearing npm cache...")
-            subprocess.check_call("npm.cmd cache clean --force", cwd=gradle_project_dir, shell=True)
-            
-            print("Installing npm dependencies with verbose output...")
-            subprocess.check_call("npm.cmd install --verbose", cwd=gradle_project_dir, env=os.environ, shell=True)
+            if os.environ.get("SUMMARIZER_FRESH_INSTALL") == "1":
+                print("Removing existing node_modules...")
+                remove_directory_tree(node_modules_dir)
+
+                print("Clearing npm cache...")
+                subprocess.check_call(["npm.cmd", "cache", "clean", "--force"], cwd=gradle_project_dir, env=_CHILD_ENV)
+            elif os.path.isdir(node_modules_dir):
+                print("Reusing existing node_modules. Set SUMMARIZER_FRESH_INSTALL=1 to force a clean install.")
+
+            # Skip the audit and funding lookups and prefer the local cache to avoid network round-trips.
+            npm_install_cmd = ["npm.cmd", "install", "--no-audit", "--no-fund", "--prefer-offline"]
+            if os.environ.get("SUMMARIZER_DEBUG"):
+                print("Installing npm dependencies with verbose output...")
+                npm_install_cmd.append("--verbose")
+            else:
+                print("Installing npm dependencies...")
+            subprocess.check_call(npm_install_cmd, cwd=gradle_project_dir, env=_CHILD_ENV)
             print("npm dependencies installed successfully.")
         except subprocess.CalledProcessError as e:
             print(f"An error occurred while installing npm dependencies: {e}")
@@ -98,17 +156,19 @@ def install_npm_dependencies():
     else:
         print("No package.json found in the gradle_project folder. Skipping npm install.")
 
+# Matches 'export KEY="value"' or 'export KEY=value' lines from 'fnm env'.
+FNM_ENV_EXPORT_RE = re.compile(r'^[ \t]*export[ \t]+([^=\s]+)=(?:"([^"\r\n]*)"|([^\r\n]*?))[ \t]*\r?$', re.M)
+
 def update_env_from_fnm():
     """
     Updates environment variables from the output of 'fnm env'.
 
     Calls 'fnm env' and parses each line that starts with "export".
-    If the line can be parsed into a key-value pair, the corresponding
+    For each line that matches a key-value pair, the corresponding
     environment variable is updated. If the key is "PATH", the value is
     prepended to the existing PATH environment variable.
 
-    If 'fnm env' fails to run, or if any error occurs during parsing,
-    exits the program with status code 1.
+    If 'fnm env' fails to run, exits the program with status code 1.
     """
     base_dir = os.path.dirname(os.path.abspath(__file__))
     local_npm_dir = os.path.join(base_dir, "Summarizer", "npm")
@@ -120,23 +180,18 @@ def update_env_from_fnm():
             [fnm_executable, "env"],
             shell=True,
             text=True,
-            env=os.environ
+            env=_CHILD_ENV
         ).strip()
         # Parse each line that starts with "export"
-        for line in env_output.splitlines():
-            line = line.strip()
-            if line.startswith("export "):
-                try:
-                    key_val = line[len("export "):]
-                    key, value = key_val.split("=", 1)
-                    value = value.strip().strip('"')
-                    if key == "PATH":
-                        os.environ[key] = value + os.pathsep + os.environ.get("PATH", "")
-                    else:
-                        os.environ[key] = value
-                    print(f"Updated environment variable: {key}")
-                except Exception as parse_err:
-                    print(f"Error parsing line: {line}: {parse_err}")
+        for match in FNM_ENV_EXPORT_RE.finditer(env_output):
+            key = match.group(1)
+            value = match.group(2) if match.group(2) is not None else match.group(3)
+            if key == "PATH":
+                os.environ[key] = value + os.pathsep + os.environ.get("PATH", "")
+            else:
+                os.environ[key] = value
+            print(f"Updated environment variable: {key}")
+        refresh_child_env()
         print("Environment variables updated successfully from fnm env.")
     except subprocess.CalledProcessError as e:
         print("Error running 'fnm env':", e)
@@ -165,7 +220,7 @@ def install_node_with_fnm(fnm_path, version="23", retries=3, delay=5):
             shell=True,
             capture_output=True,
             text=True,
-            env=os.environ
+            env=_CHILD_ENV
         )
         if result.returncode == 0:
             print("Node.js installed successfully via fnm.")
@@ -182,7 +237,83 @@ def install_node_with_fnm(fnm_path, version="23", retries=3, delay=5):
                 return False
 
 
-def install_fnm_and_node():
+def get_node_version():
+    """
+    Returns the output of 'node -v' (e.g. "v23.1.0"), or an empty string if Node.js is not on PATH.
+    """
+    try:
+        return subprocess.check_output(["node", "-v"], text=True, env=_CHILD_ENV).strip()
+    except (subprocess.CalledProcessError, OSError):
+        return ""
+
+_fnm_download_lock = threading.Lock()
+
+def download_fnm(local_npm_dir):
+    """
+    Downloads and extracts the portable fnm executable into local_npm_dir if it is not already there.
+
+    Safe to call from several threads: callers wait for an in-progress download instead of
+    starting a second one.
+
+    :param local_npm_dir: Directory that fnm.exe is extracted into.
+    :return: True if fnm.exe is available, False if downloading or extracting failed.
+    """
+    fnm_executable = os.path.join(local_npm_dir, "fnm.exe")
+    with _fnm_download_lock:
+        if os.path.exists(fnm_executable):
+            return True
+
+        os.makedirs(local_npm_dir, exist_ok=True)
+        print("Downloading portable fnm...")
+        fnm_zip_url = "https://github.com/Schniz/fnm/releases/download/v1.38.1/fnm-windows.zip"
+        tmp_zip_path = None
+        # Extract into a scratch directory next to the final location and only move
+        # fnm.exe into place once it is complete, so an interrupted run never leaves
+        # a truncated fnm.exe behind.
+        extract_dir = tempfile.mkdtemp(prefix="fnm-", dir=local_npm_dir)
+        try:
+            # Stream the archive to disk instead of buffering it in memory.
+            with urllib.request.urlopen(fnm_zip_url) as response, \
+                    tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp:
+                tmp_zip_path = tmp.name
+                shutil.copyfileobj(response, tmp, length=1024 * 1024)
+            with zipfile.ZipFile(tmp_zip_path) as z:
+                z.extractall(extract_dir)
+
+            extracted_executable = os.path.join(extract_dir, "fnm.exe")
+            if not os.path.exists(extracted_executable):
+                for item in os.listdir(extract_dir):
+                    candidate = os.path.join(extract_dir, item, "fnm.exe")
+                    if os.path.exists(candidate):
+                        extracted_executable = candidate
+                        break
+            if not os.path.exists(extracted_executable):
+                print("fnm executable could not be found after extraction.")
+                return False
+            os.replace(extracted_executable, fnm_executable)
+        except Exception as e:
+            print(f"Error downloading or extracting fnm: {e}")
+            return False
+        finally:
+            if tmp_zip_path and os.path.exists(tmp_zip_path):
+                os.unlink(tmp_zip_path)
+            shutil.rmtree(extract_dir, ignore_errors=True)
+
+        print("fnm downloaded and extracted successfully.")
+        return True
+
+def prefetch_fnm():
+    """
+    Starts downloading fnm in a background daemon thread so the download is already
+    done (or under way) by the time install_fnm_and_node needs it.
+
+    Errors are reported again when install_fnm_and_node retries the download.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    local_npm_dir = os.path.join(base_dir, "Summarizer", "npm")
+    threading.Thread(target=download_fnm, args=(local_npm_dir,), daemon=True).start()
+
+def install_fnm_and_node(node_version=None):
     """
     Installs fnm (Fast Node Manager) and Node.js version 23 locally.
 
@@ -193,42 +324,30 @@ def install_fnm_and_node():
     4. Updates environment variables using 'fnm env' to ensure Node.js and npm are accessible.
     5. Verifies the installation by checking the versions of Node.js and npm.
 
+    If Node.js 23 is already available on PATH, all of these steps are skipped.
+
     If any step fails, the function will output an error message and exit the program.
+
+    :param node_version: Output of 'node -v' if the caller already ran it. Detected here when None.
     """
+    if node_version is None:
+        node_version = get_node_version()
+    if node_version.startswith("v23."):
+        print(f"Node.js {node_version} already present. Skipping fnm setup.")
+        return
 
     base_dir = os.path.dirname(os.path.abspath(__file__))
     local_npm_dir = os.path.join(base_dir, "Summarizer", "npm")
     os.makedirs(local_npm_dir, exist_ok=True)
 
-    # Download and extract fnm if it doesn't exist.
+    # Download and extract fnm if it doesn't exist (it may already have been prefetched).
     fnm_executable = os.path.join(local_npm_dir, "fnm.exe")
-    if not os.path.exists(fnm_executable):
-        print("Downloading portable fnm...")
-        fnm_zip_url = "https://github.com/Schniz/fnm/releases/download/v1.38.1/fnm-windows.zip"
-        try:
-            with urllib.request.urlopen(fnm_zip_url) as response:
-                data = response.read()
-            with zipfile.ZipFile(io.BytesIO(data)) as z:
-                z.extractall(local_npm_dir)
-        except Exception as e:
-            print(f"Error downloading or extracting fnm: {e}")
-            sys.exit(1)
-        
-        if not os.path.exists(fnm_executable):
-            for item in os.listdir(local_npm_dir):
-                item_path = os.path.join(local_npm_dir, item)
-                if os.path.isdir(item_path):
-                    candidate = os.path.join(item_path, "fnm.exe")
-                    if os.path.exists(candidate):
-                        shutil.move(candidate, fnm_executable)
-                        break
-        if not os.path.exists(fnm_executable):
-            print("fnm executable could not be found after extraction.")
-            sys.exit(1)
-        print("fnm downloaded and extracted successfully.")
+    if not download_fnm(local_npm_dir):
+        sys.exit(1)
 
     # Set FNM_DIR so that fnm installs Node.js into local folder.
     os.environ["FNM_DIR"] = local_npm_dir
+    refresh_child_env()
     print(f"Setting FNM_DIR to: {local_npm_dir}")
 
     fnm_path = fnm_executable
@@ -245,7 +364,7 @@ def install_fnm_and_node():
     try:
         npm_version = subprocess.check_output(
             "npm.cmd -v",
-            shell=True, text=True, env=os.environ
+            shell=True, text=True, env=_CHILD_ENV
         ).strip()
         print(f"npm version detected: {npm_version}")
     except subprocess.CalledProcessError:
@@ -256,11 +375,11 @@ def install_fnm_and_node():
     try:
         node_version = subprocess.check_output(
             ["powershell", "-Command", "node -v"],
-            shell=True, text=True, env=os.environ
+            shell=True, text=True, env=_CHILD_ENV
         ).strip()
         npm_version = subprocess.check_output(
             ["powershell", "-Command", "npm -v"],
-            shell=True, text=True, env=os.environ
+            shell=True, text=True, env=_CHILD_ENV
         ).strip()
         print(f"Node.js version installed: {node_version}")
         print(f"npm version installed: {npm_version}")
@@ -268,6 +387,36 @@ def install_fnm_and_node():
         print("Error verifying Node.js/npm versions.")
         sys.exit(1)
 
+def install_node_and_npm_dependencies(node_version=None):
+    """
+    Installs fnm and Node.js, then installs the npm dependencies.
+
+    The npm install needs the Node.js toolchain set up by install_fnm_and_node,
+    so the two steps run one after the other.
+
+    :param node_version: Output of 'node -v', passed on to install_fnm_and_node.
+    """
+    install_fnm_and_node(node_version)
+    install_npm_dependencies()
+
+def install_dependencies(node_version=None):
+    """
+    Installs the Python dependencies and the Node.js/npm dependencies concurrently.
+
+    Both are dominated by network downloads and waiting on subprocesses, so running
+    them side by side takes roughly as long as the slower of the two.
+    Any error raised by either installer (including sys.exit) is re-raised here.
+
+    :param node_version: Output of 'node -v', passed on to install_fnm_and_node.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(install_python_dependencies),
+            executor.submit(install_node_and_npm_dependencies, node_version),
+        ]
+        for future in futures:
+            future.result()
+
 def run_summarizer_script():
     """
     Starts the summarizer.py script using the current Python interpreter.
@@ -316,7 +465,7 @@ def run_npm_start():
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
-            env=os.environ,
+            env=_CHILD_ENV,
             shell=True
         )
         try:
@@ -350,8 +499,9 @@ def run_summarizer():
 
 if __name__ == "__main__":
     check_python_version()
-    ensure_setuptools()
-    install_python_dependencies()
-    install_fnm_and_node()
-    install_npm_dependencies()
+    # fnm is only needed when Node.js 23 is not installed yet.
+    node_version = get_node_version()
+    if not node_version.startswith("v23."):
+        prefetch_fnm()
+    install_dependencies(node_version)
     run_summarizer()
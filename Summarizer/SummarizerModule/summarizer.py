@@ -1,16 +1,48 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from google import genai
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import functools
+import hashlib
+import threading
 import logging
 import json
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logging.basicConfig(level=logging.WARNING)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that parses requests and serializes responses with orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 CORS(app)  # Allow cross-origin requests from the add-ins
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE_PATH = os.path.join(current_dir, "config_key.json")
 
+def _read_json_file(path):
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@functools.lru_cache(maxsize=4)
 def load_config_data(config_file=CONFIG_FILE_PATH):
     result = {
         "gemini_credentials": [],
@@ -21,29 +53,189 @@ def load_config_data(config_file=CONFIG_FILE_PATH):
         return result
 
     try:
-        with open(config_file, "r", encoding="utf-8") as f:
-            config_data = json.load(f)
-
-        gemini_credentials_list = []
-        for credential_set in config_data.get("credentials", []):
-            gemini_credentials = credential_set.get("gemini_credentials", [])
-            if isinstance(gemini_credentials, list):
-                gemini_credentials_list.extend(gemini_credentials)
+        config_data = _read_json_file(config_file)
 
-        valid_gemini_credentials = [cred for cred in gemini_credentials_list if "api_key" in cred]
+        valid_gemini_credentials = [
+            cred
+            for credential_set in config_data.get("credentials", [])
+            if isinstance(credential_set.get("gemini_credentials", []), list)
+            for cred in credential_set.get("gemini_credentials", [])
+            if "api_key" in cred
+        ]
         if valid_gemini_credentials:
             result["gemini_credentials"] = valid_gemini_credentials
         else:
             logging.error("No valid gemini credentials found.")
 
     except (json.JSONDecodeError, FileNotFoundError) as e:
-        logging.error(f"Error reading config file: {e}")
+        logging.error("Error reading config file: %s", e)
 
     return result
 
 config_data = load_config_data(CONFIG_FILE_PATH)
 GEMINI_API_CREDENTIALS = config_data["gemini_credentials"]
 
+def build_gemini_clients(credentials):
+    """
+    Create one genai.Client per credential so requests can reuse them.
+
+    Credentials whose client cannot be created are logged and skipped.
+    Returns a list of (api_key, client) tuples in the same order as the credentials.
+    """
+    clients = []
+    for credential in credentials:
+        api_key = credential["api_key"]
+        try:
+            clients.append((api_key, genai.Client(api_key=api_key)))
+        except Exception as e:
+            logging.error("Failed to create client for API key %s: %s", api_key, e)
+    return clients
+
+GEMINI_CLIENTS = build_gemini_clients(GEMINI_API_CREDENTIALS)
+
+PROMPT_TEMPLATE = (
+    "Summarize the following text according to the specified format.\n"
+    "Format instructions: {fmt}\n"
+    "Apply a creativity level of {t} and ensure concise output.\n"
+    "{text}"
+)
+
+# Texts longer than this are split into chunks that are summarized in parallel,
+# and the partial summaries are then combined with one final request.
+LONG_TEXT_THRESHOLD = 8000
+CHUNK_SIZE = 4000
+MAX_CHUNK_WORKERS = 8
+
+def split_text_into_chunks(text, chunk_size=CHUNK_SIZE):
+    """
+    Split text on line boundaries into chunks of roughly chunk_size characters,
+    so that spreadsheet rows are never cut in half. A single line longer than
+    chunk_size becomes a chunk of its own.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    for line in text.splitlines(keepends=True):
+        if current and current_len + len(line) > chunk_size:
+            chunks.append("".join(current))
+            current = []
+            current_len = 0
+        current.append(line)
+        current_len += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+class SummarizationCancelled(Exception):
+    """Raised inside generate_summary when another client already produced the summary."""
+
+def generate_summary(client, model, format_prompt, temperature, source_text, cancel_event=None):
+    """
+    Summarize source_text with the given client.
+
+    Long texts are summarized chunk by chunk in parallel (map), then the partial
+    summaries are summarized again into a single result (reduce).
+
+    If cancel_event is set, no further Gemini calls are started and the streamed
+    response being read is abandoned, raising SummarizationCancelled.
+    """
+    def check_cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            raise SummarizationCancelled()
+
+    def summarize_text(text):
+        check_cancelled()
+        prompt = PROMPT_TEMPLATE.format(fmt=format_prompt, t=temperature, text=text)
+        # Stream the response so tokens are collected as soon as the model produces them.
+        parts = []
+        for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+            check_cancelled()
+            if chunk.text:
+                parts.append(chunk.text)
+        return "".join(parts)
+
+    if len(source_text) <= LONG_TEXT_THRESHOLD:
+        return summarize_text(source_text)
+
+    chunks = split_text_into_chunks(source_text)
+    if len(chunks) == 1:
+        return summarize_text(source_text)
+
+    with ThreadPoolExecutor(max_workers=min(MAX_CHUNK_WORKERS, len(chunks))) as executor:
+        partials = list(executor.map(summarize_text, chunks))
+
+    return summarize_text("\n".join(partial or "" for partial in partials))
+
+# Number of API keys raced at once. Further keys are only tried when one of
+# the running requests fails, so a single request does not use up quota on every key.
+RACE_WIDTH = 2
+
+def summarize_with_first_available_client(model, format_prompt, temperature, source_text):
+    """
+    Race the first RACE_WIDTH clients and return the first successful summary, so a
+    rate-limited or failing key does not delay the request. Whenever a request fails,
+    the next configured client is started in its place.
+
+    Once a summary is available the remaining requests are told to stop, so they
+    make no further Gemini calls.
+
+    Returns None if every client fails.
+    """
+    if not GEMINI_CLIENTS:
+        return None
+
+    cancel_event = threading.Event()
+    remaining_clients = iter(GEMINI_CLIENTS)
+    running = {}
+    executor = ThreadPoolExecutor(max_workers=min(RACE_WIDTH, len(GEMINI_CLIENTS)))
+
+    def start_next_client():
+        for api_key, client in remaining_clients:
+            future = executor.submit(
+                generate_summary, client, model, format_prompt, temperature, source_text, cancel_event
+            )
+            running[future] = api_key
+            return
+
+    try:
+        for _ in range(RACE_WIDTH):
+            start_next_client()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                api_key = running.pop(future)
+                try:
+                    summarized_text = future.result()
+                except Exception as e:
+                    logging.error("Failed with API key %s: %s", api_key, e)
+                    summarized_text = None
+                if summarized_text:
+                    print("Using API key:", api_key)
+                    print(summarized_text)
+                    logging.info("Summarization successful with API key: %s", api_key)
+                    return summarized_text
+                start_next_client()
+        return None
+    finally:
+        # Stop the losing requests and do not wait for them to notice.
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Recent summaries keyed by a hash of the request parameters, so repeated
+# requests for the same text and settings skip the Gemini call.
+SUMMARY_CACHE = TTLCache(maxsize=512, ttl=3600)
+SUMMARY_CACHE_LOCK = threading.Lock()
+
+def summary_cache_key(model, temperature, top_p, top_k, format_prompt, source_text):
+    # Length-prefix each field so that different field splits never hash the same.
+    digest = hashlib.blake2b(digest_size=16)
+    for field in (model, temperature, top_p, top_k, format_prompt, source_text):
+        data = str(field).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.digest()
+
 @app.route("/summarize", methods=["POST"])
 def summarize():
     """
@@ -78,36 +270,26 @@ def summarize():
     if not format_prompt:
         return jsonify({"error": "Summarization format is required"}), 400
 
-    command = (
-        "Summarize the following text according to the specified format.\n"
-        "Format instructions: " + format_prompt + "\n"
-        "Apply a creativity level of " + str(temperature) + " and ensure concise output.\n"
-    )
-    prompt = command + source_text
+    cache_key = summary_cache_key(model, temperature, top_p, top_k, format_prompt, source_text)
+    with SUMMARY_CACHE_LOCK:
+        cached_text = SUMMARY_CACHE.get(cache_key)
+    if cached_text is not None:
+        return jsonify({"summarized_text": cached_text}), 200
 
-    summarized_text = None
-    for credentials in GEMINI_API_CREDENTIALS:
-        api_key = credentials["api_key"]
-        try:
-            print("Using API key:", api_key)
-            client = genai.Client(api_key=api_key)
-            response = client.models.generate_content(
-                model=model, contents=prompt
-            )
-
-            summarized_text = response.text
-            print(summarized_text)
-            logging.info(f"Summarization successful with API key: {api_key}")
-            break
-
-        except Exception as e:
-            logging.error(f"Failed with API key {api_key}: {e}")
-            continue
+    summarized_text = summarize_with_first_available_client(
+        model, format_prompt, temperature, source_text
+    )
 
     if not summarized_text:
         return jsonify({"error": "Summarization failed"}), 500
 
+    with SUMMARY_CACHE_LOCK:
+        SUMMARY_CACHE[cache_key] = summarized_text
+
     return jsonify({"summarized_text": summarized_text}), 200
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Serve with waitress so that concurrent /summarize requests are handled by
+    # a pool of threads instead of being serialized by the dev server.
+    from waitress import serve
+    serve(app, host="0.0.0.0", port=5000, threads=16)